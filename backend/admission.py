@@ -0,0 +1,259 @@
+"""
+Admission control for upstream LLM streams
+
+Bounds how many provider streams the API keeps open at once:
+
+- a global slot pool sized from the provider quota
+- a token bucket per user so one classroom can't drain the quota
+- a fair wait queue (round-robin across users) with a deadline, after which
+  the request is shed with a 503 and ``Retry-After``
+
+The controller is plain asyncio and knows nothing about FastAPI, so it can be
+driven directly with a fake slow provider (see ``benchmarks/admission_bench.py``).
+"""
+import asyncio
+import bisect
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+QUEUE_WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MAX_TRACKED_USERS = 10000
+
+
+def concurrency_from_quota(requests_per_min: float, avg_stream_s: float) -> int:
+    """
+    Size the global slot pool from a provider quota (Little's law)
+
+    Args:
+        requests_per_min: Provider request quota per minute
+        avg_stream_s: Average duration of one streamed answer in seconds
+
+    Returns:
+        int: Number of concurrent streams that stays within the quota
+    """
+    return max(1, int(requests_per_min * avg_stream_s / 60.0))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus style (cumulative on export)."""
+
+    def __init__(self, buckets=QUEUE_WAIT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        cumulative = []
+        running = 0
+        for bound, n in zip(self.buckets + (math.inf,), self.counts):
+            running += n
+            cumulative.append({"le": "+Inf" if bound == math.inf else bound, "count": running})
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: float, now: float):
+        self.rate = rate_per_s
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; return 0 on success or seconds until one is available."""
+        self.refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (1.0 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        """Give back a token taken for a request that was never served."""
+        self.tokens = min(self.burst, self.tokens + 1.0)
+
+
+class Slot:
+    """A held admission slot. ``release`` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", user: str):
+        self._controller = controller
+        self.user = user
+        self.acquired_at = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if self.released:
+            return
+        self.released = True
+        self._controller._release(time.monotonic() - self.acquired_at)
+
+
+class AdmissionController:
+    """
+    Global concurrency limit + per-user token buckets + fair wait queue
+
+    Args:
+        max_concurrent: Maximum upstream streams open at once
+        user_rate_per_min: Sustained requests per user per minute
+        user_burst: Requests a user may make back-to-back
+        queue_timeout_s: How long a request may wait for a slot before a 503
+        max_queue: Waiting requests beyond this are shed immediately
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        user_rate_per_min: float = 10.0,
+        user_burst: float = 5.0,
+        queue_timeout_s: float = 10.0,
+        max_queue: int = 200,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.user_rate = user_rate_per_min / 60.0
+        self.user_burst = max(1.0, user_burst)
+        self.queue_timeout_s = queue_timeout_s
+        self.max_queue = max_queue
+
+        self.in_flight = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # user -> their waiting futures; dict order is the round-robin order
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self._avg_hold_s = 5.0
+
+        self.queue_wait = Histogram()
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+
+    # -- per-user rate -------------------------------------------------
+    def _bucket(self, user: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_USERS:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[user] = TokenBucket(self.user_rate, self.user_burst, now)
+        else:
+            self._buckets.move_to_end(user)
+        return bucket
+
+    # -- slots ---------------------------------------------------------
+    async def acquire(self, user: str) -> Slot:
+        """
+        Wait for an upstream slot on behalf of ``user``
+
+        Raises:
+            AdmissionRejected: 429 if the user is over their rate,
+                503 if the queue is full or the deadline passes
+        """
+        start = time.monotonic()
+        bucket = self._bucket(user, start)
+        wait = bucket.take(start)
+        if wait > 0:
+            self.rate_limited += 1
+            raise AdmissionRejected(429, "Too many requests. Try later.", wait)
+
+        if self.in_flight < self.max_concurrent and not self._queued:
+            self.in_flight += 1
+            return self._admit(user, start)
+
+        if self._queued >= self.max_queue:
+            bucket.refund()
+            self.shed += 1
+            raise AdmissionRejected(503, "Advisor is busy. Try later.", self._retry_after())
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user, deque()).append(fut)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over just as the deadline hit; keep it
+                return self._admit(user, start)
+            self._drop_waiter(user, fut)
+            bucket.refund()
+            self.shed += 1
+            raise AdmissionRejected(503, "Advisor is busy. Try later.", self._retry_after())
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self._release(0.0, record=False)
+            else:
+                self._drop_waiter(user, fut)
+                bucket.refund()
+            raise
+        return self._admit(user, start)
+
+    def _admit(self, user: str, start: float) -> Slot:
+        self.queue_wait.observe(time.monotonic() - start)
+        self.admitted += 1
+        return Slot(self, user)
+
+    def _drop_waiter(self, user: str, fut: asyncio.Future) -> None:
+        fut.cancel()
+        queue = self._waiters.get(user)
+        if queue is None:
+            return
+        try:
+            queue.remove(fut)
+            self._queued -= 1
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiters[user]
+
+    def _release(self, held_s: float, record: bool = True) -> None:
+        if record:
+            self._avg_hold_s = 0.8 * self._avg_hold_s + 0.2 * held_s
+        # Hand the slot straight to the next user in round-robin order
+        while self._waiters:
+            user, queue = next(iter(self._waiters.items()))
+            fut = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._waiters.move_to_end(user)
+            else:
+                del self._waiters[user]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _retry_after(self) -> float:
+        backlog = (self._queued + 1) / self.max_concurrent
+        return max(1.0, backlog * self._avg_hold_s)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "queued_users": len(self._waiters),
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
@@ -1,16 +1,37 @@
 import os
 import re
+import html
 import json
 import logging
 from typing import Optional, Dict, Any, AsyncIterator, List
 
 import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 
+try:
+    from .sse import sse_stream
+    from .admission import AdmissionController, AdmissionRejected, concurrency_from_quota
+    from .classifier import CategoryClassifier
+    from .memory import ConversationStore
+    from .utils import (
+        client_ip, extract_user_from_init_data, parse_trusted_proxies,
+        validate_telegram_init_data, verify_supabase_jwt,
+    )
+except ImportError:  # run from inside backend/ (python api.py, Procfile)
+    from sse import sse_stream
+    from admission import AdmissionController, AdmissionRejected, concurrency_from_quota
+    from classifier import CategoryClassifier
+    from memory import ConversationStore
+    from utils import (
+        client_ip, extract_user_from_init_data, parse_trusted_proxies,
+        validate_telegram_init_data, verify_supabase_jwt,
+    )
+
 # Google Gemini imports (optional)
 try:
     from google import genai
@@ -28,6 +49,7 @@ logger = logging.getLogger("budget-buddy-api")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 USE_GEMINI = os.getenv("USE_GEMINI", "false").lower() == "true"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -35,6 +57,29 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "*")
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")  # SERVER ONLY
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")  # verifies user access tokens
+
+# Reverse proxies whose X-Forwarded-For is trusted (comma-separated IPs / CIDRs)
+TRUSTED_PROXIES = parse_trusted_proxies(os.getenv("TRUSTED_PROXIES", ""))
+
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "15"))
+SSE_HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", "15"))
+
+# LLM admission control: global slots sized from the provider quota unless set explicitly
+LLM_QUOTA_RPM = float(os.getenv("LLM_QUOTA_RPM", "500"))
+LLM_AVG_STREAM_S = float(os.getenv("LLM_AVG_STREAM_S", "6"))
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT") or concurrency_from_quota(LLM_QUOTA_RPM, LLM_AVG_STREAM_S))
+LLM_USER_RATE_PER_MIN = float(os.getenv("LLM_USER_RATE_PER_MIN", "10"))
+LLM_USER_BURST = float(os.getenv("LLM_USER_BURST", "5"))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "10"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "200"))
+
+# Advisor conversation memory
+CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "8"))
+CHAT_MEMORY_MAX_CHARS = int(os.getenv("CHAT_MEMORY_MAX_CHARS", "5000000"))
+CHAT_MEMORY_SPILL_DIR = os.getenv("CHAT_MEMORY_SPILL_DIR") or None
+CHAT_MEMORY_SPILL_MAX_AGE_S = float(os.getenv("CHAT_MEMORY_SPILL_MAX_AGE_S", str(7 * 24 * 3600)))
+CHAT_MEMORY_SPILL_MAX_FILES = int(os.getenv("CHAT_MEMORY_SPILL_MAX_FILES", "50000"))
 
 if not TELEGRAM_BOT_TOKEN:
     logger.warning("TELEGRAM_BOT_TOKEN is not set. Telegram bot will not work.")
@@ -42,6 +87,11 @@ if not OPENAI_API_KEY and not (USE_GEMINI and GEMINI_API_KEY):
     logger.warning("No AI API key set - AI features will not work.")
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     logger.warning("SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY not set. DB endpoints will not work.")
+if not TRUSTED_PROXIES and not SUPABASE_JWT_SECRET:
+    logger.warning(
+        "Neither TRUSTED_PROXIES nor SUPABASE_JWT_SECRET is set. Behind a reverse proxy, web advisor "
+        "users without Telegram init data share the proxy IP and one rate limit."
+    )
 
 app = FastAPI(title="Budget Buddy API", version="1.2.0")
 
@@ -98,7 +148,7 @@ def t(key: str, lang: str) -> str:
 # -------------------------
 # Telegram
 # -------------------------
-TELEGRAM_API = "https://api.telegram.org"
+TELEGRAM_API = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 
 async def tg_send_message(chat_id: int, text: str, parse_mode: str = "HTML") -> None:
     if not TELEGRAM_BOT_TOKEN:
@@ -152,7 +202,11 @@ async def telegram_webhook(payload: Dict[str, Any]):
 
         entries = parse_entries(text)
         if entries:
-            lines = "\n".join([f"• <b>{name} {amount}</b>" for name, amount in entries])
+            categories = category_classifier.classify_many(name for name, _ in entries)
+            lines = "\n".join([
+                f"• <b>{name} {amount}</b> — {html.escape(c.category)}"
+                for (name, amount), c in zip(entries, categories)
+            ])
             reply = f"{t('try_title', lang)}\n{lines}\n\n{t('next_step', lang)}"
             await tg_send_message(chat_id, reply)
             return {"ok": True}
@@ -186,12 +240,29 @@ class ChatRequest(BaseModel):
     message: str
     language: str = "en"
     userState: Optional[UserState] = None
+    session_id: Optional[str] = None  # enables server-side conversation memory
+
+llm_admission = AdmissionController(
+    max_concurrent=LLM_MAX_CONCURRENT,
+    user_rate_per_min=LLM_USER_RATE_PER_MIN,
+    user_burst=LLM_USER_BURST,
+    queue_timeout_s=LLM_QUEUE_TIMEOUT_S,
+    max_queue=LLM_MAX_QUEUE,
+)
 
-async def stream_openai(messages: list[dict]) -> AsyncIterator[bytes]:
+conversations = ConversationStore(
+    max_turns=CHAT_MEMORY_TURNS,
+    max_chars=CHAT_MEMORY_MAX_CHARS,
+    spill_dir=CHAT_MEMORY_SPILL_DIR,
+    spill_max_age_s=CHAT_MEMORY_SPILL_MAX_AGE_S,
+    spill_max_files=CHAT_MEMORY_SPILL_MAX_FILES,
+)
+
+async def stream_openai(messages: list[dict]) -> AsyncIterator[str]:
     if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
 
-    api_url = "https://api.openai.com/v1/chat/completions"
+    api_url = f"{OPENAI_BASE_URL}/chat/completions"
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
     payload = {"model": "gpt-4o-mini", "messages": messages, "stream": True}
 
@@ -205,8 +276,22 @@ async def stream_openai(messages: list[dict]) -> AsyncIterator[bytes]:
                 body = await resp.aread()
                 logger.error(f"OpenAI error: {resp.status_code} {body}")
                 raise HTTPException(status_code=resp.status_code, detail="OpenAI API error")
-            async for chunk in resp.aiter_bytes():
-                yield chunk
+            # Unwrap OpenAI's SSE into plain text deltas; sse_stream re-encodes them
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    choices = json.loads(data).get("choices") or []
+                except ValueError:
+                    logger.warning(f"OpenAI sent malformed chunk: {data[:200]}")
+                    continue
+                if choices:
+                    content = (choices[0].get("delta") or {}).get("content")
+                    if content:
+                        yield content
 
 async def stream_gemini(messages: list[dict]) -> AsyncIterator[str]:
     if not (USE_GEMINI and GEMINI_API_KEY):
@@ -215,7 +300,13 @@ async def stream_gemini(messages: list[dict]) -> AsyncIterator[str]:
         raise HTTPException(status_code=500, detail="google-genai not installed")
 
     client = genai.Client(api_key=GEMINI_API_KEY)
-    content = f"{messages[0]['content']}\n\n{messages[-1]['content']}".strip()
+    parts = [messages[0]["content"]]
+    for m in messages[1:]:
+        if m["role"] == "system":
+            parts.append(m["content"])
+        else:
+            parts.append(f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}")
+    content = "\n\n".join(parts).strip()
 
     stream = await client.aio.models.generate_content_stream(
         model="gemini-2.5-flash",
@@ -225,25 +316,84 @@ async def stream_gemini(messages: list[dict]) -> AsyncIterator[str]:
 
     async for chunk in stream:
         if getattr(chunk, "text", None):
-            chunk_data = {"choices": [{"delta": {"content": chunk.text}}]}
-            yield f"data: {json.dumps(chunk_data)}\n\n"
-    yield "data: [DONE]\n\n"
+            yield chunk.text
+
+def advisor_identity(request: Request) -> str:
+    """Verified caller identity: Telegram init data, Supabase JWT, else client IP."""
+    init_data = request.headers.get("x-telegram-init-data")
+    if init_data and TELEGRAM_BOT_TOKEN and validate_telegram_init_data(init_data, TELEGRAM_BOT_TOKEN):
+        tg_user = extract_user_from_init_data(init_data) or {}
+        if tg_user.get("id") is not None:
+            return f"tg:{tg_user['id']}"
+
+    auth = request.headers.get("authorization") or ""
+    if SUPABASE_JWT_SECRET and auth.lower().startswith("bearer "):
+        claims = verify_supabase_jwt(auth[7:].strip(), SUPABASE_JWT_SECRET)
+        if claims and claims.get("sub"):
+            return f"sb:{claims['sub']}"
+
+    peer = request.client.host if request.client else ""
+    ip = client_ip(peer, request.headers.get("x-forwarded-for", ""), TRUSTED_PROXIES)
+    return f"ip:{ip or 'unknown'}"
 
 @app.post("/api/financial-advisor")
-async def financial_advisor(req: ChatRequest):
+async def financial_advisor(req: ChatRequest, request: Request):
     lang = (req.language or "en").lower()
     if lang not in ("en", "ru", "uz"):
         lang = "en"
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPTS[lang]},
-        {"role": "user", "content": req.message},
-    ]
-    if USE_GEMINI and GEMINI_API_KEY:
-        async def gen():
-            async for sse in stream_gemini(messages):
-                yield sse
-        return StreamingResponse(gen(), media_type="text/event-stream")
-    return StreamingResponse(stream_openai(messages), media_type="text/event-stream")
+    user = advisor_identity(request)
+    if req.session_id:
+        messages = conversations.build_messages(user, req.session_id, SYSTEM_PROMPTS[lang], req.message)
+    else:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPTS[lang]},
+            {"role": "user", "content": req.message},
+        ]
+    try:
+        slot = await llm_admission.acquire(user)
+    except AdmissionRejected as e:
+        return JSONResponse(
+            {"error": e.detail},
+            status_code=e.status_code,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    provider = stream_gemini if USE_GEMINI and GEMINI_API_KEY else stream_openai
+
+    async def remember(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+        reply = []
+        async for text in deltas:
+            reply.append(text)
+            yield text
+        conversations.record(user, req.session_id, req.message, "".join(reply))
+
+    deltas = provider(messages)
+    if req.session_id:
+        deltas = remember(deltas)
+
+    async def gen():
+        # Hold the upstream slot for the whole stream, not just this handler
+        try:
+            async for frame in sse_stream(deltas, coalesce_ms=SSE_COALESCE_MS, heartbeat_s=SSE_HEARTBEAT_S):
+                yield frame
+        finally:
+            slot.release()
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.release),
+    )
+
+@app.get("/api/financial-advisor/stats")
+async def financial_advisor_stats():
+    return {**llm_admission.stats(), "memory": conversations.stats()}
+
+@app.delete("/api/financial-advisor/sessions/{session_id}")
+async def clear_advisor_session(session_id: str, request: Request):
+    conversations.clear(advisor_identity(request), session_id)
+    return {"ok": True}
 
 # -------------------------
 # Supabase REST helper (server-side)
@@ -320,6 +470,8 @@ DEFAULT_EXPENSE_CATEGORIES = [
     ("Other", "🔸"),
 ]
 
+category_classifier = CategoryClassifier()
+
 @app.get("/api/categories")
 async def get_categories(user_id: str, type: Optional[str] = None):
     params = {"select": "*", "user_id": f"eq.{user_id}", "order": "created_at.asc"}
@@ -331,14 +483,18 @@ async def get_categories(user_id: str, type: Optional[str] = None):
 async def create_category(cat: CategoryIn):
     if cat.type not in ("expense", "income"):
         raise HTTPException(400, "type must be expense or income")
-    return await sb_insert("categories", [cat.model_dump()])
+    inserted = await sb_insert("categories", [cat.model_dump()])
+    category_classifier.invalidate(cat.user_id)
+    return inserted
 
 @app.patch("/api/categories/{category_id}")
 async def patch_category(category_id: str, body: CategoryPatch, user_id: str):
     patch = {k: v for k, v in body.model_dump().items() if v is not None}
     if not patch:
         return []
-    return await sb_patch("categories", {"id": category_id, "user_id": user_id}, patch)
+    updated = await sb_patch("categories", {"id": category_id, "user_id": user_id}, patch)
+    category_classifier.invalidate(user_id)
+    return updated
 
 @app.post("/api/categories/seed-defaults")
 async def seed_defaults(user_id: str):
@@ -358,8 +514,48 @@ async def seed_defaults(user_id: str):
             "is_active": True,
         })
     inserted = await sb_insert("categories", rows)
+    category_classifier.invalidate(user_id)
     return {"ok": True, "seeded": True, "count": len(inserted)}
 
+# -------------------------
+# Category classifier (local, no LLM)
+# -------------------------
+class ClassifyRequest(BaseModel):
+    items: List[str]
+    user_id: Optional[str] = None
+
+class ClassifyFeedback(BaseModel):
+    user_id: str
+    name: str
+    category: str
+
+async def _load_classifier_categories(user_id: str) -> None:
+    if not category_classifier.needs_categories(user_id):
+        return
+    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+        return
+    rows = await sb_select(
+        "categories",
+        {"select": "id,name", "user_id": f"eq.{user_id}", "type": "eq.expense", "is_active": "eq.true"},
+    )
+    category_classifier.load_user_categories(user_id, rows)
+
+@app.post("/api/classify")
+async def classify_entries(body: ClassifyRequest):
+    if body.user_id:
+        await _load_classifier_categories(body.user_id)
+    results = category_classifier.classify_many(body.items, body.user_id)
+    return [{"name": name, **c._asdict()} for name, c in zip(body.items, results)]
+
+@app.post("/api/classify/feedback")
+async def classify_feedback(body: ClassifyFeedback):
+    await _load_classifier_categories(body.user_id)
+    category = category_classifier.resolve_category(body.user_id, body.category)
+    if category is None:
+        raise HTTPException(400, "category must be a default category or one of the user's categories")
+    category_classifier.learn(body.user_id, body.name, category)
+    return {"ok": True, "category": category}
+
 class AllocationUpsert(BaseModel):
     user_id: str
     month: str  # YYYY-MM
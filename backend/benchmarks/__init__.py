@@ -0,0 +1,5 @@
+"""
+Benchmarks for the Budget Buddy backend
+
+Run from the backend/ directory, e.g. ``python -m benchmarks.sse_bench``.
+"""
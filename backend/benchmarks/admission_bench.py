@@ -0,0 +1,82 @@
+"""
+Admission control benchmark with a fake slow provider
+
+One "classroom" user floods the advisor while a few other users send a
+single request each. Reports how long each group waited, how many requests
+were shed and the queue-wait histogram.
+
+    python -m benchmarks.admission_bench --slots 4 --classroom 40 --others 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from admission import AdmissionController, AdmissionRejected
+
+
+async def fake_llm(duration_s: float):
+    for _ in range(10):
+        await asyncio.sleep(duration_s / 10)
+        yield "tok "
+
+
+async def call(ctrl: AdmissionController, user: str, duration_s: float, results: list) -> None:
+    start = time.perf_counter()
+    try:
+        slot = await ctrl.acquire(user)
+    except AdmissionRejected as e:
+        results.append({"user": user, "status": e.status_code, "retry_after": e.retry_after})
+        return
+    waited = time.perf_counter() - start
+    try:
+        async for _ in fake_llm(duration_s):
+            pass
+    finally:
+        slot.release()
+    results.append({"user": user, "status": 200, "wait_s": waited})
+
+
+def summarise(results: list, prefix: str) -> dict:
+    rows = [r for r in results if r["user"].startswith(prefix)]
+    waits = [r["wait_s"] for r in rows if r["status"] == 200]
+    return {
+        "requests": len(rows),
+        "ok": len(waits),
+        "rate_limited": sum(1 for r in rows if r["status"] == 429),
+        "shed": sum(1 for r in rows if r["status"] == 503),
+        "wait_p50_s": statistics.median(waits) if waits else None,
+        "wait_max_s": max(waits) if waits else None,
+    }
+
+
+async def main(args) -> None:
+    ctrl = AdmissionController(
+        max_concurrent=args.slots,
+        user_rate_per_min=args.user_rate,
+        user_burst=args.user_burst,
+        queue_timeout_s=args.queue_timeout,
+    )
+    results: list = []
+    # gather() starts these in order, so the other users queue behind the whole flood
+    tasks = [call(ctrl, "classroom", args.duration, results) for _ in range(args.classroom)]
+    tasks += [call(ctrl, f"user-{i}", args.duration, results) for i in range(args.others)]
+    await asyncio.gather(*tasks)
+    print(json.dumps({
+        "classroom": summarise(results, "classroom"),
+        "others": summarise(results, "user-"),
+        "controller": ctrl.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--classroom", type=int, default=40, help="requests from the flooding user")
+    parser.add_argument("--others", type=int, default=5, help="single requests from other users")
+    parser.add_argument("--duration", type=float, default=0.2, help="fake LLM stream duration (s)")
+    parser.add_argument("--user-rate", type=float, default=600.0, help="per-user requests/min")
+    parser.add_argument("--user-burst", type=float, default=30.0)
+    parser.add_argument("--queue-timeout", type=float, default=1.0)
+    asyncio.run(main(parser.parse_args()))
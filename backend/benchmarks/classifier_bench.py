@@ -0,0 +1,141 @@
+"""
+Category classifier benchmark
+
+Measures accuracy and throughput for single and batch classification.
+``LABELLED`` is a smoke test built from the keyword list, so it should stay at
+100%; ``REALISTIC`` holds entries as people actually type them (brands,
+slang, look-alike words, user categories) and was written without looking at
+the keywords, so its misses show where the classifier really falls short.
+
+    python -m benchmarks.classifier_bench --rounds 2000
+"""
+import argparse
+import json
+import time
+
+from classifier import CategoryClassifier
+
+LABELLED = [
+    ("Coffee", "Coffee & Snacks"), ("Kofe", "Coffee & Snacks"), ("Кофе", "Coffee & Snacks"),
+    ("Latte katta", "Coffee & Snacks"), ("Choy", "Coffee & Snacks"), ("Чай с тортом", "Coffee & Snacks"),
+    ("Taxi", "Transportation"), ("Taksi", "Transportation"), ("Такси домой", "Transportation"),
+    ("Yandex Go", "Transportation"), ("Benzin", "Transportation"), ("Метро", "Transportation"),
+    ("Bread and milk", "Food & Groceries"), ("Non", "Food & Groceries"), ("Bozor", "Food & Groceries"),
+    ("Продукты", "Food & Groceries"), ("Tushlik", "Food & Groceries"), ("Обед в столовой", "Food & Groceries"),
+    ("Rent", "Housing / Rent"), ("Ijara", "Housing / Rent"), ("Аренда квартиры", "Housing / Rent"),
+    ("Electricity bill", "Utilities"), ("Gaz", "Utilities"), ("Коммунальные", "Utilities"),
+    ("Internet", "Utilities"), ("Loan payment", "Loans & Debts"), ("Kredit", "Loans & Debts"),
+    ("Qarz", "Loans & Debts"), ("Кредит", "Loans & Debts"), ("Books", "Education"),
+    ("Kitob", "Education"), ("Курсы английского", "Education"), ("Repetitor", "Education"),
+    ("Pharmacy", "Healthcare"), ("Dorixona", "Healthcare"), ("Аптека", "Healthcare"),
+    ("Stomatolog", "Healthcare"), ("Netflix", "Subscriptions & Services"),
+    ("Telefon tarif", "Subscriptions & Services"), ("Подписка", "Subscriptions & Services"),
+    ("Shoes", "Shopping"), ("Kiyim", "Shopping"), ("Sovg‘a", "Shopping"), ("Одежда", "Shopping"),
+    ("Misc", "Other"), ("Boshqa", "Other"),
+]
+
+REALISTIC = [
+    # brands and shops
+    ("Evos lavash", "Food & Groceries"), ("Makro", "Food & Groceries"), ("Havas", "Food & Groceries"),
+    ("Dodo pizza", "Food & Groceries"), ("KFC", "Food & Groceries"), ("Uzum Market", "Shopping"),
+    ("Wildberries", "Shopping"), ("Zara", "Shopping"), ("Starbucks", "Coffee & Snacks"),
+    ("Coca-Cola", "Coffee & Snacks"), ("Snickers", "Coffee & Snacks"), ("Uber Eats", "Food & Groceries"),
+    ("Beeline", "Subscriptions & Services"), ("Ucell balans", "Subscriptions & Services"),
+    ("Spotify Premium", "Subscriptions & Services"), ("Apple Music", "Subscriptions & Services"),
+    ("MyTaxi", "Transportation"), ("Shell AI-95", "Transportation"),
+    # everyday phrasing
+    ("Taxi for work", "Transportation"), ("Bus ticket", "Transportation"), ("Metro karta", "Transportation"),
+    ("Gas station", "Transportation"), ("Avtobusga", "Transportation"), ("Штраф ГАИ", "Transportation"),
+    ("Groceries for the week", "Food & Groceries"), ("Ovqatga", "Food & Groceries"),
+    ("Шаурма", "Food & Groceries"), ("Kartoshka", "Food & Groceries"), ("Манты", "Food & Groceries"),
+    ("Ice cream", "Coffee & Snacks"), ("Kofega", "Coffee & Snacks"), ("Печенье", "Coffee & Snacks"),
+    ("Electricity for May", "Utilities"), ("Svet uchun", "Utilities"), ("Gaz to'lovi", "Utilities"),
+    ("Вода за месяц", "Utilities"), ("Квартплата", "Housing / Rent"), ("Ijara haqi", "Housing / Rent"),
+    ("Landlord", "Housing / Rent"), ("Nasiya to'lov", "Loans & Debts"), ("Отдал долг", "Loans & Debts"),
+    ("Credit card payment", "Loans & Debts"), ("Kindergarten", "Education"), ("Bog'cha", "Education"),
+    ("Репетитор по математике", "Education"), ("Учебники", "Education"), ("Daftarlar", "Education"),
+    ("Dentist", "Healthcare"), ("Vitamins", "Healthcare"), ("Таблетки от головы", "Healthcare"),
+    ("Haircut", "Subscriptions & Services"), ("Стрижка", "Subscriptions & Services"),
+    ("Gym membership", "Subscriptions & Services"), ("Wedding gift", "Shopping"),
+    ("Кроссовки", "Shopping"), ("Носки", "Shopping"), ("Sumkaga", "Shopping"),
+    # look-alikes that must not be pulled into a category by a short stem
+    ("Rentgen", "Healthcare"), ("Рентген", "Healthcare"), ("Tortilla", "Food & Groceries"),
+    ("Booking hotel", "Other"), ("Sadaqa", "Other"), ("Uber to the airport", "Transportation"),
+    ("Gas bill", "Utilities"), ("Bozor market", "Food & Groceries"),
+]
+
+# (user categories, entry, expected category)
+USER_CASES = [
+    ([{"id": "u1", "name": "Gifts for mom"}], "Taxi for work", "Transportation"),
+    ([{"id": "u1", "name": "Gifts for mom"}], "Flowers for mom", "Gifts for mom"),
+    ([{"id": "u1", "name": "Kids & school"}], "School bag", "Kids & school"),
+    ([{"id": "u1", "name": "Kids & school"}], "Coffee & cake", "Coffee & Snacks"),
+    ([{"id": "u1", "name": "Pet food"}], "Dog food", "Pet food"),
+    ([{"id": "u1", "name": "Мои поездки"}], "Такси в аэропорт", "Transportation"),
+]
+
+
+def score(clf: CategoryClassifier, samples, user_id=None) -> dict:
+    predicted = clf.classify_many([name for name, _ in samples], user_id)
+    misses = [
+        {"name": name, "expected": expected, "got": got.category}
+        for (name, expected), got in zip(samples, predicted)
+        if got.category != expected
+    ]
+    # A miss that lands in a real category is worse than falling back to Other
+    wrong = sum(m["got"] != "Other" for m in misses)
+    return {
+        "samples": len(samples),
+        "accuracy": round(1 - len(misses) / len(samples), 3),
+        "wrong_category": wrong,
+        "misses": misses,
+    }
+
+
+def score_user_cases(clf: CategoryClassifier) -> dict:
+    misses = []
+    for i, (rows, name, expected) in enumerate(USER_CASES):
+        user_id = f"case-{i}"
+        clf.load_user_categories(user_id, rows)
+        got = clf.classify(name, user_id).category
+        if got != expected:
+            misses.append({"categories": [r["name"] for r in rows], "name": name, "expected": expected, "got": got})
+    return {"samples": len(USER_CASES), "accuracy": round(1 - len(misses) / len(USER_CASES), 3), "misses": misses}
+
+
+def main(args) -> None:
+    clf = CategoryClassifier()
+    names = [name for name, _ in LABELLED]
+
+    accuracy = {
+        "keyword_smoke": score(clf, LABELLED),
+        "realistic": score(clf, REALISTIC),
+        "user_categories": score_user_cases(clf),
+    }
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for name in names:
+            clf.classify(name)
+    single_s = time.perf_counter() - start
+
+    clf.load_user_categories("bench-user", [{"id": "c1", "name": "Coffee & Snacks"}, {"id": "c2", "name": "Gym"}])
+    clf.learn("bench-user", "Lavash", "Coffee & Snacks")
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        clf.classify_many(names, "bench-user")
+    batch_s = time.perf_counter() - start
+
+    total = args.rounds * len(names)
+    print(json.dumps({
+        "accuracy": accuracy,
+        "single_us_per_entry": single_s * 1e6 / total,
+        "batch_with_user_us_per_entry": batch_s * 1e6 / total,
+        "entries_per_s": total / single_s,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    main(parser.parse_args())
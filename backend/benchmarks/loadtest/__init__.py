@@ -0,0 +1,5 @@
+"""
+End-to-end load test: the API with local fake Supabase, Telegram and LLM upstreams
+
+Run from the backend/ directory: ``python -m benchmarks.loadtest --help``.
+"""
@@ -0,0 +1,331 @@
+"""
+End-to-end load test for the Budget Buddy API
+
+Starts the fake Supabase, Telegram and LLM upstreams
+(``benchmarks.loadtest.fakes``) and the API (``benchmarks.loadtest.server``)
+as two subprocesses, drives a realistic request mix at increasing concurrency
+and writes req/s, p50/p95/p99 latency and the API's RSS as JSON. Keeping the
+fakes out of the API process means the RSS and req/s cover only the API.
+
+    python -m benchmarks.loadtest --concurrency 1,8,32 --duration 10 --out baseline.json
+    python -m benchmarks.loadtest --out new.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.loadtest.fakes import add_arguments as add_fake_arguments
+
+MONTH = "2026-10"
+WEBHOOK_TEXTS = [
+    "Coffee 50000", "Taksi 30000", "Кофе 15000\nТакси 20000", "Non 5000\nSut 12000",
+    "/start", "/help", "Salary 5000000", "hello",
+]
+ADVISOR_QUESTIONS = [
+    ("How can I save more money?", "en"),
+    ("Как сократить расходы на такси?", "ru"),
+    ("Qanday qilib ko'proq pul tejash mumkin?", "uz"),
+]
+
+# op name -> weight in the default mix
+DEFAULT_MIX = {
+    "webhook": 30,
+    "categories_read": 25,
+    "category_write": 5,
+    "allocations_read": 20,
+    "allocation_write": 10,
+    "advisor_stream": 10,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_rss_kb(pid: int) -> Dict[str, Optional[int]]:
+    """Current and peak RSS of ``pid`` in kB (Linux only)."""
+    out: Dict[str, Optional[int]] = {"rss_kb": None, "peak_rss_kb": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    out["rss_kb"] = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    out["peak_rss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return out
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def latency_summary(values: List[float]) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": _ms(percentile(values, 50)),
+        "p95_ms": _ms(percentile(values, 95)),
+        "p99_ms": _ms(percentile(values, 99)),
+        "max_ms": _ms(values[-1] if values else None),
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000.0, 3)
+
+
+class Workload:
+    def __init__(self, users: int, seed: int, mix: Dict[str, int]):
+        self.rng = random.Random(seed)
+        self.users = [f"loadtest-user-{i}" for i in range(users)]
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.update_id = 0
+
+    def pick(self) -> str:
+        return self.rng.choices(self.ops, self.weights)[0]
+
+    def user(self) -> str:
+        return self.rng.choice(self.users)
+
+    async def run(self, client: httpx.AsyncClient, op: str):
+        """Issue one request; returns (status, ttfb_s or None)."""
+        user = self.user()
+        if op == "webhook":
+            self.update_id += 1
+            payload = {
+                "update_id": self.update_id,
+                "message": {"chat": {"id": 1000 + self.users.index(user)}, "text": self.rng.choice(WEBHOOK_TEXTS)},
+            }
+            r = await client.post("/telegram/webhook", json=payload)
+            return r.status_code, None
+        if op == "categories_read":
+            r = await client.get("/api/categories", params={"user_id": user, "type": "expense"})
+            return r.status_code, None
+        if op == "category_write":
+            body = {"user_id": user, "name": f"Custom {self.rng.randint(1, 50)}", "type": "expense"}
+            r = await client.post("/api/categories", json=body)
+            return r.status_code, None
+        if op == "allocations_read":
+            r = await client.get("/api/allocations", params={"user_id": user, "month": MONTH})
+            return r.status_code, None
+        if op == "allocation_write":
+            body = {
+                "user_id": user,
+                "month": MONTH,
+                "category_id": f"cat-{self.rng.randint(1, 11)}",
+                "percent": round(self.rng.uniform(0, 30), 1),
+            }
+            r = await client.post("/api/allocations", json=body)
+            return r.status_code, None
+        if op == "advisor_stream":
+            message, lang = self.rng.choice(ADVISOR_QUESTIONS)
+            body = {"message": message, "language": lang, "session_id": f"{user}-chat"}
+            # The server trusts X-Forwarded-For from 127.0.0.1, giving each fake user its own IP
+            n = self.users.index(user)
+            headers = {"X-Forwarded-For": f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"}
+            start = time.perf_counter()
+            ttfb = None
+            async with client.stream("POST", "/api/financial-advisor", json=body, headers=headers) as r:
+                async for _ in r.aiter_bytes():
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+            return r.status_code, ttfb
+        raise ValueError(f"unknown op {op}")
+
+
+async def run_step(base_url: str, workload: Workload, concurrency: int, duration_s: float, pid: int) -> dict:
+    latencies: Dict[str, List[float]] = {op: [] for op in workload.ops}
+    ttfbs: List[float] = []
+    statuses: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration_s
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                op = workload.pick()
+                start = time.perf_counter()
+                try:
+                    status, ttfb = await workload.run(client, op)
+                except httpx.HTTPError as e:
+                    status, ttfb = type(e).__name__, None
+                latencies[op].append(time.perf_counter() - start)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if ttfb is not None:
+                    ttfbs.append(ttfb)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    everything = [v for values in latencies.values() for v in values]
+    ok = sum(n for s, n in statuses.items() if s.isdigit() and 200 <= int(s) < 300)
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": len(everything),
+        "req_per_s": round(len(everything) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(1 - ok / len(everything), 4) if everything else 0.0,
+        "statuses": statuses,
+        "latency": latency_summary(everything),
+        "by_op": {op: latency_summary(values) for op, values in latencies.items()},
+        "advisor_ttfb": latency_summary(ttfbs),
+        **read_rss_kb(pid),
+    }
+
+
+async def seed(base_url: str, workload: Workload) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        for user in workload.users:
+            r = await client.post("/api/categories/seed-defaults", params={"user_id": user})
+            r.raise_for_status()
+
+
+async def wait_ready(base_url: str, proc: subprocess.Popen, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> List[str]:
+    old_steps = {s["concurrency"]: s for s in baseline.get("steps", [])}
+    lines = [f"{'conc':>5} {'req/s old':>10} {'req/s new':>10} {'Δ%':>7} {'p95 old':>9} {'p95 new':>9} {'Δ%':>7}"]
+    for step in current["steps"]:
+        old = old_steps.get(step["concurrency"])
+        if old is None:
+            continue
+        p95_old, p95_new = old["latency"]["p95_ms"], step["latency"]["p95_ms"]
+        lines.append(
+            f"{step['concurrency']:>5} {old['req_per_s']:>10.1f} {step['req_per_s']:>10.1f} "
+            f"{_pct(old['req_per_s'], step['req_per_s']):>7} "
+            f"{(p95_old or 0):>9.1f} {(p95_new or 0):>9.1f} {_pct(p95_old, p95_new):>7}"
+        )
+    return lines
+
+
+def _pct(old: Optional[float], new: Optional[float]) -> str:
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) * 100.0 / old:+.1f}"
+
+
+async def main(args) -> dict:
+    port = args.port or free_port()
+    fake_port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    fakes_cmd = [
+        sys.executable, "-m", "benchmarks.loadtest.fakes", "--port", str(fake_port),
+        "--llm-ttft-ms", str(args.llm_ttft_ms), "--llm-token-ms", str(args.llm_token_ms),
+        "--llm-tokens", str(args.llm_tokens), "--db-latency-ms", str(args.db_latency_ms),
+        "--telegram-latency-ms", str(args.telegram_latency_ms),
+    ]
+    api_cmd = [sys.executable, "-m", "benchmarks.loadtest.server", "--port", str(port), "--fake-port", str(fake_port)]
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    fakes = subprocess.Popen(fakes_cmd, stdout=log, stderr=log, cwd=os.getcwd())
+    proc = None
+    try:
+        await wait_ready(f"http://127.0.0.1:{fake_port}", fakes)
+        proc = subprocess.Popen(api_cmd, stdout=log, stderr=log, cwd=os.getcwd())
+        await wait_ready(base_url, proc)
+        workload = Workload(args.users, args.seed, DEFAULT_MIX)
+        await seed(base_url, workload)
+        idle = read_rss_kb(proc.pid)
+
+        steps = []
+        for concurrency in args.concurrency:
+            step = await run_step(base_url, workload, concurrency, args.duration, proc.pid)
+            steps.append(step)
+            print(
+                f"concurrency={concurrency:<4} req/s={step['req_per_s']:<9} "
+                f"p50={step['latency']['p50_ms']}ms p95={step['latency']['p95_ms']}ms "
+                f"p99={step['latency']['p99_ms']}ms errors={step['error_rate']:.2%} "
+                f"rss={step['rss_kb']}kB",
+                file=sys.stderr,
+            )
+    finally:
+        for p in (proc, fakes):
+            if p is None:
+                continue
+            p.terminate()
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        if log is not subprocess.DEVNULL:
+            log.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "server_log")},
+            "mix": DEFAULT_MIX,
+            "idle_rss_kb": idle["rss_kb"],
+        },
+        "steps": steps,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 8, 32, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency step")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0, help="API port (default: random free port)")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    parser.add_argument("--server-log", help="write API and fake upstream stdout/stderr here")
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print("\n".join(compare(report, json.load(f))), file=sys.stderr)
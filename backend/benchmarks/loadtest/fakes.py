@@ -0,0 +1,193 @@
+"""
+Local stand-ins for the services the API talks to
+
+One FastAPI app serves all three, so the API under test only needs its base
+URLs pointed here. It runs in its own process so the API's RSS and CPU are
+measured on their own:
+
+    python -m benchmarks.loadtest.fakes --port 8901
+
+- ``/rest/v1/{table}``: in-memory PostgREST subset (select / eq filters /
+  order / limit, insert with merge-duplicates upsert, patch). ``categories``
+  is unique on (user_id, name), so repeated category writes update one row
+  instead of growing the table over the run
+- ``/bot{token}/sendMessage``: Telegram Bot API
+- ``/v1/chat/completions``: OpenAI-compatible streaming LLM with configurable latency
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Columns PostgREST would use for on-conflict upserts, per table
+UPSERT_KEYS = {
+    "budget_allocations": ("user_id", "month", "category_id"),
+}
+# Unique constraints: a conflicting insert updates the existing row
+UNIQUE_KEYS = {
+    "categories": ("user_id", "name"),
+}
+RESERVED_PARAMS = {"select", "order", "limit", "offset"}
+
+
+class PostgrestStub:
+    def __init__(self):
+        self.tables: Dict[str, List[dict]] = {}
+
+    def _filter(self, rows: List[dict], params) -> List[dict]:
+        for col, cond in params.items():
+            if col in RESERVED_PARAMS:
+                continue
+            op, _, value = cond.partition(".")
+            if op != "eq":
+                raise ValueError(f"unsupported filter {col}={cond}")
+            rows = [r for r in rows if str(r.get(col)).lower() == value.lower()]
+        return rows
+
+    def select(self, table: str, params) -> List[dict]:
+        rows = self._filter(self.tables.get(table, []), params)
+        order = params.get("order")
+        if order:
+            col, _, direction = order.partition(".")
+            rows = sorted(rows, key=lambda r: str(r.get(col)), reverse=direction == "desc")
+        if "limit" in params:
+            rows = rows[: int(params["limit"])]
+        select = params.get("select", "*")
+        if select != "*":
+            cols = [c.strip() for c in select.split(",")]
+            rows = [{c: r.get(c) for c in cols} for r in rows]
+        return rows
+
+    def insert(self, table: str, rows: List[dict], merge: bool) -> List[dict]:
+        data = self.tables.setdefault(table, [])
+        keys = UNIQUE_KEYS.get(table) or (UPSERT_KEYS.get(table) if merge else None)
+        out = []
+        for row in rows:
+            if keys:
+                existing = next((r for r in data if all(r.get(k) == row.get(k) for k in keys)), None)
+                if existing is not None:
+                    existing.update(row)
+                    out.append(existing)
+                    continue
+            stored = {
+                "id": str(uuid.uuid4()),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                **row,
+            }
+            data.append(stored)
+            out.append(stored)
+        return out
+
+    def patch(self, table: str, params, patch: dict) -> List[dict]:
+        rows = self._filter(self.tables.get(table, []), params)
+        for r in rows:
+            r.update(patch)
+        return rows
+
+
+def create_fake_upstreams(
+    llm_ttft_ms: float = 300.0,
+    llm_token_ms: float = 20.0,
+    llm_tokens: int = 120,
+    db_latency_ms: float = 5.0,
+    telegram_latency_ms: float = 30.0,
+) -> FastAPI:
+    """
+    Build the fake upstream app
+
+    Args:
+        llm_ttft_ms: Delay before the first LLM token
+        llm_token_ms: Delay between LLM tokens
+        llm_tokens: Tokens per LLM answer
+        db_latency_ms: Added latency per PostgREST call
+        telegram_latency_ms: Added latency per Telegram call
+    """
+    app = FastAPI(title="Budget Buddy fake upstreams")
+    db = PostgrestStub()
+    app.state.db = db
+
+    async def delay(ms: float) -> None:
+        if ms > 0:
+            await asyncio.sleep(ms / 1000.0)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    # -- PostgREST ------------------------------------------------------
+    @app.get("/rest/v1/{table}")
+    async def pg_select(table: str, request: Request):
+        await delay(db_latency_ms)
+        try:
+            return db.select(table, request.query_params)
+        except ValueError as e:
+            return JSONResponse({"message": str(e)}, status_code=400)
+
+    @app.post("/rest/v1/{table}")
+    async def pg_insert(table: str, request: Request):
+        await delay(db_latency_ms)
+        body = await request.json()
+        rows = body if isinstance(body, list) else [body]
+        merge = "merge-duplicates" in request.headers.get("prefer", "")
+        return JSONResponse(db.insert(table, rows, merge), status_code=201)
+
+    @app.patch("/rest/v1/{table}")
+    async def pg_patch(table: str, request: Request):
+        await delay(db_latency_ms)
+        try:
+            return db.patch(table, request.query_params, await request.json())
+        except ValueError as e:
+            return JSONResponse({"message": str(e)}, status_code=400)
+
+    # -- Telegram -------------------------------------------------------
+    @app.post("/bot{token}/sendMessage")
+    async def tg_send_message(token: str, request: Request):
+        await delay(telegram_latency_ms)
+        payload = await request.json()
+        return {"ok": True, "result": {"message_id": 1, "chat": {"id": payload.get("chat_id")}, "text": payload.get("text")}}
+
+    # -- OpenAI-compatible LLM ------------------------------------------
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        await request.json()
+
+        async def stream():
+            await delay(llm_ttft_ms)
+            for i in range(llm_tokens):
+                chunk = {"choices": [{"index": 0, "delta": {"content": f"tok{i} "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+                await delay(llm_token_ms)
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=20.0)
+    parser.add_argument("--llm-tokens", type=int, default=120)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--telegram-latency-ms", type=float, default=30.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8901)
+    add_arguments(parser)
+    args = parser.parse_args()
+    app = create_fake_upstreams(
+        llm_ttft_ms=args.llm_ttft_ms,
+        llm_token_ms=args.llm_token_ms,
+        llm_tokens=args.llm_tokens,
+        db_latency_ms=args.db_latency_ms,
+        telegram_latency_ms=args.telegram_latency_ms,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
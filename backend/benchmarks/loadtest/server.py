@@ -0,0 +1,46 @@
+"""
+Run the API against the fake upstreams
+
+The API's base URLs are pointed at ``benchmarks.loadtest.fakes`` (started
+separately, see there) through the environment before ``api`` is imported,
+so this process holds only the API and its RSS / CPU are the API's own.
+
+    python -m benchmarks.loadtest.fakes --port 8901
+    python -m benchmarks.loadtest.server --port 8900 --fake-port 8901
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def configure_env(fake_port: int) -> None:
+    base = f"http://127.0.0.1:{fake_port}"
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "loadtest",
+        "TELEGRAM_API_URL": base,
+        "OPENAI_API_KEY": "loadtest",
+        "OPENAI_BASE_URL": f"{base}/v1",
+        "USE_GEMINI": "false",
+        "SUPABASE_URL": base,
+        "SUPABASE_SERVICE_ROLE_KEY": "loadtest",
+        "TRUSTED_PROXIES": "127.0.0.1",
+    })
+    # Generous admission limits unless the caller wants to measure them
+    os.environ.setdefault("LLM_MAX_CONCURRENT", "256")
+    os.environ.setdefault("LLM_USER_RATE_PER_MIN", "100000")
+    os.environ.setdefault("LLM_USER_BURST", "1000")
+
+
+def serve(args) -> None:
+    configure_env(args.fake_port)
+    import api  # noqa: E402 - must come after configure_env
+
+    uvicorn.run(api.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--fake-port", type=int, default=8901)
+    serve(parser.parse_args())
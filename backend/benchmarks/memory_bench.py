@@ -0,0 +1,78 @@
+"""
+Conversation memory benchmark
+
+Simulates long advisor chats and reports prompt size per turn, store size
+and time spent building prompts.
+
+Sessions are visited round-robin, so if together they need more than
+``--max-chars`` LRU evicts each one before its next turn and the prompt only
+looks bounded because its history is gone. The defaults fit under the cap;
+``history_misses`` counts prompts that came back without history, and
+``last_prompt`` shows whether the final prompt carries the summary and the
+recent turns.
+
+    python -m benchmarks.memory_bench --turns 200 --sessions 200
+"""
+import argparse
+import json
+import tempfile
+import time
+
+from memory import ConversationStore
+
+QUESTION = "How can I save more of my salary this month? I spend a lot on taxi and coffee. "
+ANSWER = "Try setting a weekly limit for taxis and make coffee at home. Track it daily. " * 6
+
+
+def prompt_chars(messages: list) -> int:
+    return sum(len(m["content"]) for m in messages)
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as spill:
+        store = ConversationStore(max_chars=args.max_chars, spill_dir=spill if args.spill else None)
+        sizes = []
+        evictions = []
+        build_s = 0.0
+        history_misses = 0
+        for turn in range(args.turns):
+            evicted_before = store.evicted
+            for s in range(args.sessions):
+                start = time.perf_counter()
+                messages = store.build_messages(f"user-{s}", "chat", "system prompt", QUESTION)
+                build_s += time.perf_counter() - start
+                if turn > 0 and len(messages) <= 2:
+                    history_misses += 1
+                store.record(f"user-{s}", "chat", QUESTION, ANSWER)
+            sizes.append(prompt_chars(messages))
+            evictions.append(store.evicted - evicted_before)
+
+        print(json.dumps({
+            "turns": args.turns,
+            "sessions": args.sessions,
+            "prompt_chars_turn_1": sizes[0],
+            "prompt_chars_turn_10": sizes[min(9, len(sizes) - 1)],
+            "prompt_chars_last": sizes[-1],
+            "prompt_chars_max": max(sizes),
+            "naive_history_chars_last": args.turns * (len(QUESTION) + len(ANSWER)),
+            "last_prompt": {
+                "has_summary": any(m["content"].startswith("Earlier in this conversation") for m in messages),
+                "recent_turns": sum(m["role"] == "assistant" for m in messages),
+                "max_turns": store.max_turns,
+            },
+            "history_misses": history_misses,
+            "history_miss_rate": history_misses / max(1, (args.turns - 1) * args.sessions),
+            "evictions_per_turn_avg": sum(evictions) / len(evictions),
+            "evictions_per_turn_max": max(evictions),
+            "build_us_per_turn": build_s * 1e6 / (args.turns * args.sessions),
+            "store": store.stats(),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--max-chars", type=int, default=2_000_000)
+    parser.add_argument("--spill", action="store_true", help="spill evicted sessions to a temp dir")
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+"""
+SSE encoder benchmark
+
+Streams a fake provider through the old per-chunk ``json.dumps`` path and
+through ``sse.sse_stream`` and reports frames, bytes, CPU and the delay
+each token picks up between the provider and the wire. Real LLMs emit a
+token every 20-50 ms; small gaps show the burst case.
+
+    python -m benchmarks.sse_bench --gap-ms 0,2,20,40 --tokens 100 --responses 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sse import sse_stream
+
+TOKEN = "tok "  # fixed width, so the token count of a frame is len(content) / 4
+
+
+async def fake_provider(tokens: int, gap_ms: float, sent: list):
+    for _ in range(tokens):
+        if gap_ms:
+            await asyncio.sleep(gap_ms / 1000.0)
+        sent.append(time.perf_counter())
+        yield TOKEN
+
+
+async def legacy_stream(deltas):
+    async for text in deltas:
+        chunk_data = {"choices": [{"delta": {"content": text}}]}
+        yield f"data: {json.dumps(chunk_data)}\n\n".encode()
+    yield b"data: [DONE]\n\n"
+
+
+async def run_one(make_stream, tokens: int, gap_ms: float) -> dict:
+    sent: list = []
+    frames = []
+    cpu = time.process_time()
+    async for frame in make_stream(fake_provider(tokens, gap_ms, sent)):
+        frames.append((time.perf_counter(), frame))
+    cpu = time.process_time() - cpu
+
+    # Attribute each token to the frame that carried it
+    delays = []
+    i = 0
+    for at, frame in frames:
+        if not frame.startswith(b"data: {"):
+            continue
+        count = len(json.loads(frame[6:])["choices"][0]["delta"]["content"]) // len(TOKEN)
+        delays.extend(at - t for t in sent[i:i + count])
+        i += count
+    return {
+        "frames": len(frames),
+        "bytes": sum(len(f) for _, f in frames),
+        "cpu_s": cpu,
+        "delays": delays,
+    }
+
+
+async def bench(name: str, make_stream, gap_ms: float, args) -> dict:
+    runs = [await run_one(make_stream, args.tokens, gap_ms) for _ in range(args.responses)]
+    delays = sorted(d for r in runs for d in r["delays"])
+    return {
+        "name": name,
+        "frames_per_response": sum(r["frames"] for r in runs) / len(runs),
+        "bytes_per_response": sum(r["bytes"] for r in runs) / len(runs),
+        "cpu_ms_per_response": round(sum(r["cpu_s"] for r in runs) * 1000.0 / len(runs), 3),
+        "token_delay_mean_ms": round(statistics.mean(delays) * 1000.0, 3),
+        "token_delay_max_ms": round(delays[-1] * 1000.0, 3),
+    }
+
+
+async def main(args) -> None:
+    report = []
+    for gap_ms in args.gap_ms:
+        report.append({
+            "gap_ms": gap_ms,
+            "results": [
+                await bench("legacy_json_dumps", legacy_stream, gap_ms, args),
+                await bench(
+                    f"sse_stream_{args.coalesce_ms:g}ms",
+                    lambda d: sse_stream(d, coalesce_ms=args.coalesce_ms),
+                    gap_ms,
+                    args,
+                ),
+                await bench("sse_stream_0ms", lambda d: sse_stream(d, coalesce_ms=0), gap_ms, args),
+            ],
+        })
+    print(json.dumps({"tokens": args.tokens, "runs": report}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument(
+        "--gap-ms", type=lambda s: [float(x) for x in s.split(",")], default=[0.0, 2.0, 20.0, 40.0],
+        help="comma-separated delays between provider tokens",
+    )
+    parser.add_argument("--responses", type=int, default=5)
+    parser.add_argument("--coalesce-ms", type=float, default=15.0)
+    asyncio.run(main(parser.parse_args()))
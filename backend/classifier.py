@@ -0,0 +1,329 @@
+"""
+Offline category classifier for parsed entries
+
+Maps item names from ``parse_entries`` ("Coffee 50000", "Taksi 30000",
+"Кофе 15000") to expense categories without calling an LLM:
+
+1. per-user learned overrides (LRU-bounded)
+2. the user's own category names from the ``categories`` table
+3. a multilingual (en/ru/uz) keyword trie over the default categories
+
+Keywords of five or more characters, and shorter stems marked with a
+trailing ``*``, match as word prefixes so inflected forms ("кофейня",
+"taksiga") still hit; other short keywords must match the whole word, so
+"Rentgen" is not rent and "Tortilla" is not a cake. Known two-word phrases
+("Uzum Market", "Gas station") are matched before single words, and a few
+generic keywords only count when nothing else in the name could change their
+meaning, so ambiguous items fall back to "Other" rather than a wrong category.
+"""
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+OTHER_CATEGORY = "Other"
+MAX_USERS = 5000
+MAX_OVERRIDES_PER_USER = 500
+MIN_PREFIX_LEN = 5
+
+# Words ignored when indexing the user's own category names
+STOPWORDS = {
+    "and", "for", "the", "my", "our", "of", "to", "in", "on", "with", "from", "other", "misc",
+    "и", "для", "на", "в", "с", "по", "мои", "мой", "моя", "прочее", "другое",
+    "va", "uchun", "bilan", "mening", "boshqa",
+}
+
+# Default category name -> keywords (lowercase, en / uz / ru)
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "Food & Groceries": [
+        "food", "foods", "grocer", "bread", "milk", "meat", "egg", "eggs", "fruit", "vegetable", "rice",
+        "market", "supermarket", "lunch", "dinner", "breakfast", "restaurant", "pizza", "burger",
+        "oziq*", "non", "sut", "go'sht", "tuxum", "meva*", "sabzavot", "guruch", "bozor", "ovqat",
+        "tushlik", "kechki", "nonushta", "restoran", "oshxona", "osh", "somsa", "lavash", "korzinka",
+        "еда", "продукт", "хлеб*", "молок", "мясо", "мяса", "яйц*", "фрукт", "овощ*", "рис", "рынок", "базар",
+        "супермаркет", "обед*", "ужин*", "завтрак", "ресторан", "столов", "плов", "самса", "пицц*",
+    ],
+    "Utilities": [
+        "utilit", "electric", "electricity", "gas", "heating", "internet", "wifi",
+        "svet", "elektr", "suv", "gaz", "kommunal", "isitish",
+        "свет", "света", "электр", "вода", "воды", "воду", "газ", "коммунал", "отоплен", "интернет",
+    ],
+    "Transportation": [
+        "taxi*", "bus", "metro", "fuel", "petrol", "transport", "uber*", "yandex", "train", "parking",
+        "taksi", "avtobus", "benzin", "poyezd", "yo'l", "yo'lkira", "propan", "metan",
+        "такси", "автобус", "метро", "бензин", "транспорт", "поезд", "парковк", "проезд",
+    ],
+    "Housing / Rent": [
+        "rent", "rental", "housing", "apartment", "house", "mortgage", "repair",
+        "ijara", "kvartira", "uy", "ipoteka", "ta'mir",
+        "аренд", "квартир", "жиль*", "ипотек", "ремонт",
+    ],
+    "Loans & Debts": [
+        "loan*", "debt*", "credit", "installment",
+        "kredit", "qarz*", "nasiya", "muddatli",
+        "кредит", "долг*", "заём", "займ", "рассрочк",
+    ],
+    "Education": [
+        "book", "books", "course", "school", "tuition", "university", "education", "tutor",
+        "stationery", "notebook",
+        "kitob", "kurs*", "maktab", "kontrakt", "universitet", "ta'lim", "repetitor", "daftar",
+        "книг*", "курс*", "школ*", "контракт", "университет", "образован", "репетитор", "канцеляр",
+        "тетрад", "учеб*",
+    ],
+    "Healthcare": [
+        "doctor", "pharmacy", "medicine", "hospital", "clinic", "dentist", "pills",
+        "shifokor", "doktor", "dorixona", "dori*", "kasalxona", "klinika", "stomatolog", "tabletka",
+        "врач*", "аптек", "лекарств", "больниц", "клиник", "стоматолог", "таблетк", "анализ",
+    ],
+    "Coffee & Snacks": [
+        "coffee", "tea", "snack", "cake", "cakes", "chocolate", "latte", "cappuccino", "espresso", "juice",
+        "cola", "chips", "donut", "sweets", "candy", "icecream",
+        "kofe*", "choy*", "tort", "shokolad", "muzqaymoq", "sharbat", "shirinlik", "konfet", "pirojniy",
+        "кофе", "кофейн", "чай", "снек*", "торт", "торта", "тортик", "пирож", "шоколад", "морожен", "капучино", "латте", "сок",
+        "кола", "чипс*", "сладост", "конфет",
+    ],
+    "Subscriptions & Services": [
+        "subscription", "netflix", "spotify", "youtube", "icloud", "phone", "mobile", "haircut",
+        "laundry", "gym",
+        "obuna", "telefon", "mobil", "sartarosh", "tarif", "paynet",
+        "подписк", "телефон", "мобильн", "парикмахер", "стрижк", "тариф", "связь",
+    ],
+    "Shopping": [
+        "clothes", "shoes", "shop", "shopping", "gift", "gifts", "dress", "shirt", "bag", "cosmetic",
+        "kiyim", "poyabzal", "do'kon", "sovg'a", "ko'ylak", "sumka", "kosmetika",
+        "одежд", "обув*", "магазин", "подар", "плать", "рубашк", "сумк*", "космети",
+    ],
+}
+
+# Two-word names whose meaning differs from their words; checked before keywords
+PHRASE_KEYWORDS: Dict[str, str] = {
+    "gas station": "Transportation", "petrol station": "Transportation", "yandex go": "Transportation",
+    "uber eats": "Food & Groceries", "yandex eats": "Food & Groceries", "yandex lavka": "Food & Groceries",
+    "uzum market": "Shopping", "yandex market": "Shopping", "online market": "Shopping",
+    "uzum nasiya": "Loans & Debts", "yandex plus": "Subscriptions & Services",
+}
+
+# Keywords too generic to trust next to unknown words ("Uzum Market", "Uber Eats")
+GENERIC_KEYWORDS = {"market", "gas", "uber", "yandex"}
+
+# Words that never change what a generic keyword means
+NEUTRAL_WORDS = STOPWORDS | {
+    "bill", "payment", "pay", "paid", "to'lov", "to'lovi", "oplata", "оплата", "счет", "счёт", "за",
+}
+
+_APOSTROPHES = str.maketrans({"‘": "'", "’": "'", "ʻ": "'", "ʼ": "'", "`": "'"})
+_WORD_RE = re.compile(r"[\w']+")
+_TERMINAL = ""  # trie key holding (category, exact_only)
+_STEM = "*"  # keyword suffix: prefix-match even if shorter than MIN_PREFIX_LEN
+
+
+class Classification(NamedTuple):
+    category: str
+    category_id: Optional[str]
+    source: str  # override / user / keyword / default
+
+
+def normalize(name: str) -> str:
+    return " ".join(_WORD_RE.findall((name or "").lower().translate(_APOSTROPHES)))
+
+
+class KeywordTrie:
+    """Character trie of keywords; the longest keyword matching a word wins."""
+
+    def __init__(self):
+        self.root: dict = {}
+
+    def add(self, keyword: str, category: str) -> None:
+        stem = keyword.endswith(_STEM)
+        keyword = normalize(keyword)
+        if not keyword:
+            return
+        node = self.root
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[_TERMINAL] = (category, not stem and len(keyword) < MIN_PREFIX_LEN)
+
+    def match_word(self, word: str):
+        """Return (category, matched_length) for the best keyword in ``word``."""
+        node = self.root
+        best = None
+        depth = 0
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                break
+            depth += 1
+            hit = node.get(_TERMINAL)
+            if hit is not None and (not hit[1] or depth == len(word)):
+                best = (hit[0], depth)
+        return best
+
+    def match(self, words: List[str]):
+        """Return (category, matched_length) for the best keyword in ``words``."""
+        best = None
+        for word in words:
+            hit = self.match_word(word)
+            if hit is not None and (best is None or hit[1] > best[1]):
+                best = hit
+        return best
+
+
+def _build_default_trie() -> KeywordTrie:
+    trie = KeywordTrie()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for kw in keywords:
+            trie.add(kw, category)
+    return trie
+
+
+class _UserIndex:
+    def __init__(self, rows: Iterable[dict], loaded: bool = True):
+        self.loaded = loaded
+        self.ids: Dict[str, str] = {}  # lower category name -> id
+        self.names: Dict[str, str] = {}  # lower category name -> display name
+        self.trie = KeywordTrie()
+        for row in rows:
+            name = (row.get("name") or "").strip()
+            if not name:
+                continue
+            key = name.lower()
+            self.ids[key] = row.get("id")
+            self.names[key] = name
+            if name not in CATEGORY_KEYWORDS:
+                for word in normalize(name).split():
+                    if len(word) >= 3 and word not in STOPWORDS:
+                        self.trie.add(word, name)
+        self.overrides: "OrderedDict[str, str]" = OrderedDict()
+
+
+class CategoryClassifier:
+    """
+    Classify item names into categories
+
+    Args:
+        max_users: Users whose categories / overrides are kept in memory
+        max_overrides: Learned corrections kept per user (LRU)
+    """
+
+    def __init__(self, max_users: int = MAX_USERS, max_overrides: int = MAX_OVERRIDES_PER_USER):
+        self.max_users = max_users
+        self.max_overrides = max_overrides
+        self.default_trie = _build_default_trie()
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+
+    # -- per-user state ------------------------------------------------
+    def _user(self, user_id: Optional[str]) -> Optional[_UserIndex]:
+        """The user's index, marked as most recently used."""
+        index = self._users.get(user_id) if user_id is not None else None
+        if index is not None:
+            self._users.move_to_end(user_id)
+        return index
+
+    def needs_categories(self, user_id: str) -> bool:
+        """True if the user's ``categories`` rows should be (re)loaded."""
+        index = self._user(user_id)
+        return index is None or not index.loaded
+
+    def load_user_categories(self, user_id: str, rows: Iterable[dict], loaded: bool = True) -> None:
+        """Index the user's ``categories`` rows, keeping learned overrides."""
+        old = self._users.get(user_id)
+        index = _UserIndex(rows, loaded)
+        if old is not None:
+            index.overrides = old.overrides
+        self._users[user_id] = index
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the user's category rows (e.g. after they edit categories)."""
+        if user_id in self._users:
+            self.load_user_categories(user_id, [], loaded=False)
+
+    def resolve_category(self, user_id: str, category: str) -> Optional[str]:
+        """
+        Canonical name of ``category`` for this user
+
+        Returns:
+            str: The default or user category name, or None if it is neither
+        """
+        key = (category or "").strip().lower()
+        index = self._user(user_id)
+        if index is not None and key in index.names:
+            return index.names[key]
+        for name in [*CATEGORY_KEYWORDS, OTHER_CATEGORY]:
+            if name.lower() == key:
+                return name
+        return None
+
+    def learn(self, user_id: str, name: str, category: str) -> None:
+        """Remember that ``name`` belongs to ``category`` for this user."""
+        key = normalize(name)
+        if not key:
+            return
+        index = self._user(user_id)
+        if index is None:
+            self.load_user_categories(user_id, [], loaded=False)
+            index = self._users[user_id]
+        index.overrides[key] = category
+        index.overrides.move_to_end(key)
+        while len(index.overrides) > self.max_overrides:
+            index.overrides.popitem(last=False)
+
+    # -- classification ------------------------------------------------
+    def classify(self, name: str, user_id: Optional[str] = None) -> Classification:
+        key = normalize(name)
+        words = key.split()
+        index = self._user(user_id)
+
+        if index is not None:
+            overrides = index.overrides
+            if overrides:
+                for candidate in [key] + words:
+                    category = overrides.get(candidate)
+                    if category is not None:
+                        overrides.move_to_end(candidate)
+                        return self._result(index, category, "override")
+        # The user's own category wins only if it matches at least as much of the name
+        user_hit = index.trie.match(words) if index is not None else None
+        keyword_hit = self._keyword_match(words)
+        if user_hit is not None and (keyword_hit is None or user_hit[1] >= keyword_hit[1]):
+            return self._result(index, user_hit[0], "user")
+        if keyword_hit is not None:
+            return self._result(index, keyword_hit[0], "keyword")
+        return self._result(index, OTHER_CATEGORY, "default")
+
+    def _keyword_match(self, words: List[str]):
+        """Best (category, matched_length) from phrases, then the default keywords."""
+        for first, second in zip(words, words[1:]):
+            category = PHRASE_KEYWORDS.get(f"{first} {second}")
+            if category is not None:
+                return category, len(first) + len(second) + 1
+        best = None
+        for word in words:
+            hit = self.default_trie.match_word(word)
+            if hit is None or (best is not None and hit[1] <= best[1]):
+                continue
+            if word[: hit[1]] in GENERIC_KEYWORDS and not self._plain_context(words, word, hit[0]):
+                continue
+            best = hit
+        return best
+
+    def _plain_context(self, words: List[str], word: str, category: str) -> bool:
+        """True if every other word is neutral, a number or a keyword of ``category``."""
+        for other in words:
+            if other == word or other in NEUTRAL_WORDS or other.isdigit():
+                continue
+            hit = self.default_trie.match_word(other)
+            if hit is None or hit[0] != category:
+                return False
+        return True
+
+    def classify_many(self, names: Iterable[str], user_id: Optional[str] = None) -> List[Classification]:
+        return [self.classify(name, user_id) for name in names]
+
+    @staticmethod
+    def _result(index: Optional[_UserIndex], category: str, source: str) -> Classification:
+        if index is None:
+            return Classification(category, None, source)
+        key = category.lower()
+        return Classification(index.names.get(key, category), index.ids.get(key), source)
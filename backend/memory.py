@@ -0,0 +1,264 @@
+"""
+Server-side conversation memory for the AI advisor
+
+Each (user, session) conversation keeps:
+
+- a fixed-size ring buffer of the most recent turns (one turn is a user
+  message plus the assistant's reply)
+- a compact rolling summary of the turns that fell out of the buffer
+
+so the prompt sent upstream stays bounded however long the chat runs. All
+conversations share a global size cap; the least recently used sessions are
+evicted first, optionally spilling to disk so they can be picked up later.
+Spill files are bounded too: old ones expire, and past a file cap the oldest
+are removed.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+logger = logging.getLogger("budget-buddy-api")
+
+DEFAULT_MAX_TURNS = 8
+DEFAULT_TURN_CHARS = 1500
+DEFAULT_SUMMARY_CHARS = 1200
+DEFAULT_MAX_CHARS = 5_000_000
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_SPILL_MAX_AGE_S = 7 * 24 * 3600
+DEFAULT_SPILL_MAX_FILES = 50000
+SPILL_SWEEP_INTERVAL_S = 60.0
+
+_SENTENCE_RE = re.compile(r"(.+?[.!?])(\s|$)", re.S)
+_ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+def _gist(text: str, limit: int = 160) -> str:
+    """First sentence of ``text``, squeezed onto one line and truncated."""
+    text = " ".join(text.split())
+    m = _SENTENCE_RE.match(text)
+    if m:
+        text = m.group(1)
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class Conversation:
+    def __init__(self, max_turns: int, summary_chars: int):
+        # (role, content) messages; two per turn
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=2 * max_turns)
+        self.summary: List[str] = []
+        self.summary_chars = summary_chars
+        self.updated = time.time()
+
+    def size(self) -> int:
+        return sum(len(c) for _, c in self.turns) + sum(len(s) for s in self.summary)
+
+    def add(self, role: str, content: str) -> None:
+        if len(self.turns) == self.turns.maxlen:
+            old_role, old_content = self.turns[0]
+            self._summarise(old_role, old_content)
+        self.turns.append((role, content))
+        self.updated = time.time()
+
+    def _summarise(self, role: str, content: str) -> None:
+        self.summary.append(f"{_ROLE_LABELS.get(role, role)}: {_gist(content)}")
+        total = sum(len(s) + 1 for s in self.summary)
+        while self.summary and total > self.summary_chars:
+            total -= len(self.summary.pop(0)) + 1
+
+    def to_dict(self) -> dict:
+        return {"turns": list(self.turns), "summary": self.summary, "updated": self.updated}
+
+    @classmethod
+    def from_dict(cls, data: dict, max_turns: int, summary_chars: int) -> "Conversation":
+        conv = cls(max_turns, summary_chars)
+        conv.summary = list(data.get("summary") or [])
+        for role, content in data.get("turns") or []:
+            conv.add(role, content)
+        conv.updated = data.get("updated", conv.updated)
+        return conv
+
+
+class ConversationStore:
+    """
+    Bounded per-(user, session) conversation memory
+
+    Args:
+        max_turns: Recent user/assistant exchanges kept verbatim per conversation
+        turn_chars: Longest single turn kept (longer ones are truncated)
+        summary_chars: Size of the rolling summary per conversation
+        max_chars: Global cap across all conversations
+        max_sessions: Global cap on the number of conversations
+        spill_dir: If set, evicted conversations are written here as JSON
+        spill_max_age_s: Spilled conversations older than this are deleted
+        spill_max_files: Cap on spill files; the oldest are deleted beyond it
+    """
+
+    def __init__(
+        self,
+        max_turns: int = DEFAULT_MAX_TURNS,
+        turn_chars: int = DEFAULT_TURN_CHARS,
+        summary_chars: int = DEFAULT_SUMMARY_CHARS,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        spill_dir: Optional[str] = None,
+        spill_max_age_s: float = DEFAULT_SPILL_MAX_AGE_S,
+        spill_max_files: int = DEFAULT_SPILL_MAX_FILES,
+    ):
+        self.max_turns = max(1, max_turns)
+        self.turn_chars = turn_chars
+        self.summary_chars = summary_chars
+        self.max_chars = max_chars
+        self.max_sessions = max_sessions
+        self.spill_dir = spill_dir
+        self.spill_max_age_s = spill_max_age_s
+        self.spill_max_files = spill_max_files
+
+        self._sessions: "OrderedDict[Tuple[str, str], Conversation]" = OrderedDict()
+        self._sizes: dict = {}
+        self.total_chars = 0
+        self.evicted = 0
+        self.spill_removed = 0
+        self._last_sweep = 0.0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._sweep_spill(force=True)
+
+    # -- lookup / eviction ---------------------------------------------
+    def _spill_path(self, key: Tuple[str, str]) -> str:
+        digest = hashlib.sha1(f"{key[0]}\0{key[1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.json")
+
+    def _get(self, key: Tuple[str, str], create: bool) -> Optional[Conversation]:
+        conv = self._sessions.get(key)
+        if conv is not None:
+            self._sessions.move_to_end(key)
+            return conv
+        if self.spill_dir:
+            path = self._spill_path(key)
+            try:
+                expired = time.time() - os.path.getmtime(path) > self.spill_max_age_s
+                if not expired:
+                    with open(path, "r", encoding="utf-8") as f:
+                        conv = Conversation.from_dict(json.load(f), self.max_turns, self.summary_chars)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not load spilled conversation {path}: {e}")
+        if conv is None and create:
+            conv = Conversation(self.max_turns, self.summary_chars)
+        if conv is not None:
+            self._sessions[key] = conv
+            self._account(key, conv)
+        return conv
+
+    def _account(self, key: Tuple[str, str], conv: Conversation) -> None:
+        size = conv.size()
+        self.total_chars += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._evict(keep=key)
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        while self._sessions and (self.total_chars > self.max_chars or len(self._sessions) > self.max_sessions):
+            key, conv = next(iter(self._sessions.items()))
+            if key == keep:
+                break
+            self._drop(key)
+            self.evicted += 1
+            if self.spill_dir:
+                try:
+                    with open(self._spill_path(key), "w", encoding="utf-8") as f:
+                        json.dump(conv.to_dict(), f, ensure_ascii=False)
+                except OSError as e:
+                    logger.warning(f"Could not spill conversation: {e}")
+                self._sweep_spill()
+
+    def _sweep_spill(self, force: bool = False) -> None:
+        """Delete expired spill files, then the oldest beyond the file cap."""
+        now = time.time()
+        if not force and now - self._last_sweep < SPILL_SWEEP_INTERVAL_S:
+            return
+        self._last_sweep = now
+        files = []
+        try:
+            with os.scandir(self.spill_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        files.append((entry.stat().st_mtime, entry.path))
+        except OSError as e:
+            logger.warning(f"Could not scan spill dir {self.spill_dir}: {e}")
+            return
+        files.sort()
+        excess = len(files) - self.spill_max_files
+        for i, (mtime, path) in enumerate(files):
+            if i >= excess and now - mtime <= self.spill_max_age_s:
+                break
+            try:
+                os.remove(path)
+                self.spill_removed += 1
+            except OSError:
+                pass
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        self._sessions.pop(key, None)
+        self.total_chars -= self._sizes.pop(key, 0)
+
+    # -- public API ----------------------------------------------------
+    def build_messages(self, user: str, session: str, system_prompt: str, message: str) -> List[dict]:
+        """
+        Messages to send upstream for the next turn
+
+        Args:
+            user: User key (Supabase uid, Telegram id or client IP)
+            session: Chat session id from the frontend
+            system_prompt: Language-specific system prompt
+            message: The new user message
+
+        Returns:
+            list: system prompt, rolling summary, recent turns and the new message
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        conv = self._get((user, session), create=False)
+        if conv is not None:
+            if conv.summary:
+                messages.append({
+                    "role": "system",
+                    "content": "Earlier in this conversation:\n" + "\n".join(conv.summary),
+                })
+            messages.extend({"role": role, "content": content} for role, content in conv.turns)
+        messages.append({"role": "user", "content": message[: self.turn_chars]})
+        return messages
+
+    def record(self, user: str, session: str, message: str, reply: str) -> None:
+        """Store a completed user/assistant exchange (skipped if the reply is empty)."""
+        # The ring buffer holds whole turns; a lone user message would break the pairing
+        if not reply:
+            return
+        key = (user, session)
+        conv = self._get(key, create=True)
+        conv.add("user", message[: self.turn_chars])
+        conv.add("assistant", reply[: self.turn_chars])
+        self._account(key, conv)
+
+    def clear(self, user: str, session: str) -> None:
+        key = (user, session)
+        self._drop(key)
+        if self.spill_dir:
+            try:
+                os.remove(self._spill_path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "total_chars": self.total_chars,
+            "max_chars": self.max_chars,
+            "evicted": self.evicted,
+            "spill_removed": self.spill_removed,
+        }
@@ -0,0 +1,169 @@
+"""
+Server-Sent Events encoding for the AI advisor stream
+
+Every provider is reduced to an async iterator of text deltas; this module
+turns that into one normalised event stream the frontend understands:
+
+    data: {"choices":[{"delta":{"content":"..."}}]}\n\n
+    ...
+    data: [DONE]\n\n
+
+Tokens that arrive close together are coalesced into a single frame and idle
+streams get ``: ping`` comments so proxies don't drop the connection.
+"""
+import asyncio
+from json.encoder import encode_basestring_ascii
+from typing import AsyncIterator, Optional
+
+# Precomputed byte templates (the frontend reads choices[0].delta.content)
+FRAME_PREFIX = b'data: {"choices":[{"delta":{"content":'
+FRAME_SUFFIX = b'}}]}\n\n'
+DONE_FRAME = b"data: [DONE]\n\n"
+HEARTBEAT_FRAME = b": ping\n\n"
+
+DEFAULT_COALESCE_MS = 15.0
+DEFAULT_MAX_FRAME_BYTES = 2048
+DEFAULT_HEARTBEAT_S = 15.0
+
+
+def encode_delta(text: str) -> bytes:
+    """
+    Encode a text delta as a single SSE data frame
+
+    Args:
+        text: Token text from the provider
+
+    Returns:
+        bytes: ``data: {...}\\n\\n`` frame in the normalised schema
+    """
+    return FRAME_PREFIX + encode_basestring_ascii(text).encode("ascii") + FRAME_SUFFIX
+
+
+def _resolve(fut: Optional[asyncio.Future]) -> None:
+    if fut is not None and not fut.done():
+        fut.set_result(None)
+
+
+async def sse_stream(
+    deltas: AsyncIterator[str],
+    coalesce_ms: float = DEFAULT_COALESCE_MS,
+    max_frame_bytes: int = DEFAULT_MAX_FRAME_BYTES,
+    heartbeat_s: float = DEFAULT_HEARTBEAT_S,
+) -> AsyncIterator[bytes]:
+    """
+    Turn provider text deltas into normalised, coalesced SSE frames
+
+    Coalescing is adaptive: a delta that arrives more than ``coalesce_ms``
+    after the previous one (the first delta, or a provider slower than the
+    window) is flushed at once. Only during bursts, when deltas arrive closer
+    together than the window, is the buffer held until ``coalesce_ms`` after
+    its first delta or until it reaches ``max_frame_bytes``. While the
+    provider is silent, a heartbeat comment is sent every ``heartbeat_s``
+    seconds (``heartbeat_s <= 0`` disables heartbeats).
+
+    The provider is drained by one background task; the consumer is woken
+    through a plain future and the burst/heartbeat deadlines use
+    ``loop.call_later``, so no extra tasks are created per frame.
+
+    Args:
+        deltas: Async iterator of text chunks from a provider
+        coalesce_ms: Coalescing window in milliseconds (0 disables batching)
+        max_frame_bytes: Flush threshold for buffered text
+        heartbeat_s: Idle interval before sending a heartbeat comment (0 disables heartbeats)
+
+    Yields:
+        bytes: SSE frames, terminated by ``data: [DONE]``
+    """
+    loop = asyncio.get_running_loop()
+    window = max(coalesce_ms, 0.0) / 1000.0
+    buf: list[str] = []
+    buf_len = 0
+    batch_start = 0.0
+    last_arrival: Optional[float] = None
+    burst = False
+    holding = False
+    done = False
+    error: Optional[BaseException] = None
+    waiter: Optional[asyncio.Future] = None
+    last_frame_at = loop.time()
+    heartbeat_due = False
+    heartbeat_handle = None
+
+    async def pump() -> None:
+        nonlocal buf_len, batch_start, last_arrival, burst, done, error
+        try:
+            async for text in deltas:
+                if not text:
+                    continue
+                now = loop.time()
+                burst = last_arrival is not None and now - last_arrival < window
+                last_arrival = now
+                if not buf:
+                    batch_start = now
+                buf.append(text)
+                buf_len += len(text)
+                if not holding or buf_len >= max_frame_bytes:
+                    _resolve(waiter)
+        except Exception as e:
+            error = e
+        finally:
+            done = True
+            _resolve(waiter)
+
+    def heartbeat() -> None:
+        nonlocal heartbeat_due, heartbeat_handle
+        if loop.time() - last_frame_at >= heartbeat_s * 0.999:
+            heartbeat_due = True
+            _resolve(waiter)
+            heartbeat_handle = loop.call_later(heartbeat_s, heartbeat)
+        else:
+            heartbeat_handle = loop.call_at(last_frame_at + heartbeat_s, heartbeat)
+
+    task = asyncio.ensure_future(pump())
+    if heartbeat_s > 0:
+        heartbeat_handle = loop.call_later(heartbeat_s, heartbeat)
+    try:
+        while True:
+            if not buf and not done and not heartbeat_due:
+                waiter = loop.create_future()
+                await waiter
+                waiter = None
+
+            if heartbeat_due:
+                heartbeat_due = False
+                if not buf:
+                    last_frame_at = loop.time()
+                    yield HEARTBEAT_FRAME
+                    continue
+
+            if buf and burst and window and not done and buf_len < max_frame_bytes:
+                delay = batch_start + window - loop.time()
+                if delay > 0:
+                    holding = True
+                    waiter = loop.create_future()
+                    timer = loop.call_later(delay, _resolve, waiter)
+                    try:
+                        await waiter
+                    finally:
+                        timer.cancel()
+                        holding = False
+                        waiter = None
+
+            if buf:
+                text = "".join(buf)
+                buf.clear()
+                buf_len = 0
+                last_frame_at = loop.time()
+                yield encode_delta(text)
+
+            if error is not None:
+                raise error
+            if done and not buf:
+                break
+
+        yield DONE_FRAME
+    finally:
+        if heartbeat_handle is not None:
+            heartbeat_handle.cancel()
+        if not task.done():
+            task.cancel()
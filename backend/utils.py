@@ -1,8 +1,12 @@
 """
 Utility functions for Telegram bot and API
 """
+import base64
 import hmac
 import hashlib
+import ipaddress
+import json
+import time
 from urllib.parse import parse_qs, urlencode
 
 
@@ -81,3 +85,88 @@ def extract_user_from_init_data(init_data: str):
     except Exception as e:
         print(f"Error extracting user data: {e}")
         return None
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def verify_supabase_jwt(token: str, jwt_secret: str):
+    """
+    Verify a Supabase access token signed with the project JWT secret (HS256)
+    
+    Args:
+        token: The bearer token from the Authorization header
+        jwt_secret: SUPABASE_JWT_SECRET from the project API settings
+    
+    Returns:
+        dict: Token claims if the signature is valid and not expired, else None
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64url_decode(header_b64))
+        if header.get("alg") != "HS256":
+            return None
+        
+        expected = hmac.new(
+            jwt_secret.encode('utf-8'),
+            f"{header_b64}.{payload_b64}".encode('ascii'),
+            hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature_b64)):
+            return None
+        
+        claims = json.loads(_b64url_decode(payload_b64))
+        if claims.get("exp") is not None and claims["exp"] < time.time():
+            return None
+        return claims
+    except Exception:
+        return None
+
+
+def parse_trusted_proxies(value: str):
+    """
+    Parse a comma-separated list of proxy addresses / CIDR ranges
+    
+    Args:
+        value: e.g. "10.0.0.0/8,127.0.0.1"
+    
+    Returns:
+        list: ip_network objects
+    """
+    networks = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if item:
+            networks.append(ipaddress.ip_network(item, strict=False))
+    return networks
+
+
+def client_ip(peer: str, forwarded_for: str, trusted_proxies) -> str:
+    """
+    Resolve the real client address behind trusted reverse proxies
+    
+    X-Forwarded-For is only honoured when the direct peer is a trusted
+    proxy; the rightmost address that is not a trusted proxy is the client.
+    
+    Args:
+        peer: Address of the direct TCP peer
+        forwarded_for: Raw X-Forwarded-For header (may be empty)
+        trusted_proxies: Networks from parse_trusted_proxies
+    
+    Returns:
+        str: Client IP address
+    """
+    def trusted(addr: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(addr)
+        except ValueError:
+            return False
+        return any(ip in net for net in trusted_proxies)
+    
+    if not peer or not forwarded_for or not trusted(peer):
+        return peer
+    for addr in reversed([a.strip() for a in forwarded_for.split(",") if a.strip()]):
+        if not trusted(addr):
+            return addr
+    return peer
@@ -1,6 +1,7 @@
-import { useState, useCallback } from 'react';
+import { useState, useCallback, useRef } from 'react';
 import { UserState } from '@/types/budget';
 import { Language } from '@/i18n/translations';
+import { supabase } from '@/lib/supabase';
 
 // Support both Supabase Edge Function and Python API
 const SUPABASE_URL = import.meta.env.VITE_SUPABASE_URL;
@@ -18,9 +19,26 @@ export interface ChatMessage {
   timestamp: Date;
 }
 
+// Lets the Python API identify the caller (Telegram init data or Supabase session)
+async function identityHeaders(): Promise<Record<string, string>> {
+  const headers: Record<string, string> = {};
+  const initData = window.Telegram?.WebApp?.initData;
+  if (initData) headers["X-Telegram-Init-Data"] = initData;
+  const { data } = await supabase.auth.getSession().catch(() => ({ data: { session: null } }));
+  if (data.session?.access_token) headers.Authorization = `Bearer ${data.session.access_token}`;
+  return headers;
+}
+
+const newSessionId = () =>
+  typeof crypto !== 'undefined' && 'randomUUID' in crypto
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 export function useAIChat(userState: UserState, language: Language) {
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const [isLoading, setIsLoading] = useState(false);
+  // The Python API keeps the conversation history server-side per session
+  const sessionIdRef = useRef<string>(newSessionId());
 
   const sendMessage = useCallback(async (content: string) => {
     if (!content.trim() || isLoading) return;
@@ -61,6 +79,8 @@ export function useAIChat(userState: UserState, language: Language) {
       // Only add Supabase auth header if using Supabase
       if (SUPABASE_URL && !API_URL) {
         headers.Authorization = `Bearer ${import.meta.env.VITE_SUPABASE_PUBLISHABLE_KEY}`;
+      } else if (API_URL) {
+        Object.assign(headers, await identityHeaders());
       }
       
       const resp = await fetch(CHAT_URL, {
@@ -69,6 +89,7 @@ export function useAIChat(userState: UserState, language: Language) {
         body: JSON.stringify({
           message: content,
           language,
+          session_id: sessionIdRef.current,
           userState: {
             month: userState.month,
             virtualIncome: userState.virtualIncome,
@@ -160,7 +181,21 @@ export function useAIChat(userState: UserState, language: Language) {
   }, [userState, language, isLoading]);
 
   const clearMessages = useCallback(() => {
+    const sessionId = sessionIdRef.current;
     setMessages([]);
+    sessionIdRef.current = newSessionId();
+
+    // Let the backend drop its copy of the old conversation
+    if (API_URL) {
+      identityHeaders()
+        .then((headers) =>
+          fetch(`${API_URL}/api/financial-advisor/sessions/${encodeURIComponent(sessionId)}`, {
+            method: "DELETE",
+            headers,
+          })
+        )
+        .catch((error) => console.error("Failed to clear chat session:", error));
+    }
   }, []);
 
   return {